@@ -4,35 +4,125 @@
 """Sort `mike`'s `version.json` file with a custom order."""
 
 
+import hashlib
 import json
 import sys
-from typing import Any, TextIO
+from typing import Any
 
 from .... import github
 from ....mkdocs.mike import sort_mike_versions
 
+try:
+    # orjson parses and serializes JSON noticeably faster than the stdlib, but
+    # it is optional, the stdlib json module is used when it is not installed
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
-def _load_and_sort_versions_from(stream: TextIO) -> dict[str, dict[str, Any]]:
-    """Load the versions from the given stream and sort them.
+
+def _loads_json(data: bytes | str) -> Any:
+    """Parse the given JSON document.
+
+    Args:
+        data: The JSON document to parse.
+
+    Returns:
+        The parsed document.
+    """
+    if orjson is not None:
+        # pylint can't introspect orjson's C extension module
+        return orjson.loads(data)  # pylint: disable=no-member
+    return json.loads(data)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialize the given object to a compact JSON document.
 
     Args:
-        stream: The stream to read the versions from.
+        obj: The object to serialize.
+
+    Returns:
+        The serialized JSON document as UTF-8 bytes.
+    """
+    if orjson is not None:
+        # pylint can't introspect orjson's C extension module
+        return orjson.dumps(obj)  # pylint: disable=no-member
+    return json.dumps(obj, separators=(",", ":")).encode("utf8")
+
+
+def _load_and_sort_versions(raw: bytes) -> list[dict[str, Any]]:
+    """Load the versions from the given JSON document and sort them.
+
+    Args:
+        raw: The JSON document to load the versions from.
 
     Returns:
         The sorted loaded versions.
     """
-    versions = {v["version"]: v for v in json.load(stream)}
-    return {v: versions[v] for v in sort_mike_versions(list(versions.keys()))}
+    versions = {v["version"]: v for v in _loads_json(raw)}
+    return [versions[v] for v in sort_mike_versions(list(versions.keys()))]
+
+
+def _read_sort_cache(cache_path: str, digest: str) -> bytes | None:
+    """Read the cached sorted versions for the given input digest.
+
+    Args:
+        cache_path: The path to the cache file.
+        digest: The digest of the input the cached output must match.
+
+    Returns:
+        The cached sorted versions, or `None` if there is no cache or it was
+            generated from a different input.
+    """
+    try:
+        with open(cache_path, "rb") as stream:
+            if stream.readline().strip() == digest.encode("ascii"):
+                return stream.read()
+    except OSError:
+        pass
+    return None
+
+
+def _write_sort_cache(cache_path: str, digest: str, sorted_raw: bytes) -> None:
+    """Write the sorted versions for the given input digest to the cache.
+
+    Args:
+        cache_path: The path to the cache file.
+        digest: The digest of the input the sorted versions were generated
+            from.
+        sorted_raw: The sorted versions to cache.
+    """
+    try:
+        with open(cache_path, "wb") as stream:
+            stream.write(digest.encode("ascii") + b"\n" + sorted_raw)
+    except OSError:
+        pass  # The cache is only an optimization, failing to write it is OK
+
 
+def _sort_file(path: str) -> None:
+    """Replace the contents of the given file with the sorted versions.
 
-def _dump_versions_to(versions: dict[str, dict[str, Any]], stream: TextIO) -> None:
-    """Dump the versions to the given stream.
+    A side-car cache file (`<path>.sortcache`) stores a hash of the last input
+    together with the sorted output generated from it, so re-sorting an
+    unchanged file (the common case when docs are re-deployed for the same
+    commit) skips the parsing and sorting entirely.
 
     Args:
-        versions: The versions to dump.
-        stream: The stream to write the versions to.
+        path: The path to the `versions.json` file to sort.
     """
-    json.dump(list(versions.values()), stream, separators=(",", ":"))
+    with open(path, "rb") as stream_in:
+        raw = stream_in.read()
+
+    digest = hashlib.sha256(raw).hexdigest()
+    cache_path = path + ".sortcache"
+    sorted_raw = _read_sort_cache(cache_path, digest)
+
+    if sorted_raw is None:
+        sorted_raw = _dumps_json(_load_and_sort_versions(raw))
+        _write_sort_cache(cache_path, digest, sorted_raw)
+
+    with open(path, "wb") as stream_out:
+        stream_out.write(sorted_raw)
 
 
 def main() -> None:
@@ -53,12 +143,13 @@ def main() -> None:
 
     match len(sys.argv):
         case 1:
-            _dump_versions_to(_load_and_sort_versions_from(sys.stdin), sys.stdout)
+            # Read and write bytes directly to skip the text decode/encode
+            # round trip of the standard stream wrappers
+            sys.stdout.buffer.write(
+                _dumps_json(_load_and_sort_versions(sys.stdin.buffer.read()))
+            )
         case 2:
-            with open(sys.argv[1], "r", encoding="utf8") as stream_in:
-                versions = _load_and_sort_versions_from(stream_in)
-            with open(sys.argv[1], "w", encoding="utf8") as stream_out:
-                _dump_versions_to(versions, stream_out)
+            _sort_file(sys.argv[1])
 
         case _:
             print(
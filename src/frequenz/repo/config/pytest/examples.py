@@ -23,13 +23,22 @@ pytest_collect_file = Sybil(**examples.get_sybil_arguments()).pytest()
 """
 
 import ast
+import atexit
+import concurrent.futures
+import functools
+import hashlib
+import io
+import itertools
+import json
 import os
-import subprocess
+import tempfile
 import textwrap
 from pathlib import Path
 from typing import Any
 
-from sybil import Example
+from pylint.lint import Run
+from pylint.reporters.text import TextReporter
+from sybil import Document, Example
 from sybil.evaluators.python import pad
 from sybil.parsers.myst import CodeBlockParser
 
@@ -37,13 +46,30 @@ _PYLINT_DISABLE_COMMENT = (
     "# pylint: {}=unused-import,wildcard-import,unused-wildcard-import"
 )
 
-_FORMAT_STRING = """
+# The scaffolding wrapped around the import header of every example, built
+# once instead of re-formatting the same constants for each example. The
+# generated source is: prefix + import header + suffix + example code.
+_IMPORTS_PREFIX = f"""
 # Generated auto-imports for code example
-{disable_pylint}
-{imports}
-{enable_pylint}
+{_PYLINT_DISABLE_COMMENT.format("disable")}
+"""
+
+_IMPORTS_SUFFIX = f"""
+{_PYLINT_DISABLE_COMMENT.format("enable")}
+
+"""
+
+_SCAFFOLDING_NEWLINES = (_IMPORTS_PREFIX + _IMPORTS_SUFFIX).count("\n")
 
-{code}"""
+_PYLINT_DISABLE_PARAMS = [
+    "missing-module-docstring",
+    "missing-class-docstring",
+    "missing-function-docstring",
+    "reimported",
+    "unused-variable",
+    "no-name-in-module",
+    "await-outside-async",
+]
 
 
 def get_sybil_arguments() -> dict[str, Any]:
@@ -62,9 +88,75 @@ def get_sybil_arguments() -> dict[str, Any]:
     }
 
 
+# The extracted import statements are cached by content hash and persisted
+# across runs in pytest's cache directory, so repeated runs over unchanged
+# files (e.g. with `--lf`) skip the parsing entirely. JSON is used instead of
+# pickle so loading a stale or tampered cache file can't execute code.
+_IMPORTS_CACHE_PATH = Path(".pytest_cache/v/frequenz.repo.config/sybil_imports.json")
+
+_imports_cache: dict[str, list[str]] | None = None
+_imports_cache_dirty: bool = False
+
+
+def _load_imports_cache() -> dict[str, list[str]]:
+    """Load the persisted import statements cache.
+
+    Returns:
+        The loaded cache, or an empty one if it can't be loaded.
+    """
+    try:
+        with _IMPORTS_CACHE_PATH.open(encoding="utf8") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    return cache
+
+
+def _save_imports_cache() -> None:
+    """Persist the import statements cache if it changed in this run."""
+    if not _imports_cache_dirty or _imports_cache is None:
+        return
+    try:
+        _IMPORTS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with _IMPORTS_CACHE_PATH.open("w", encoding="utf8") as cache_file:
+            json.dump(_imports_cache, cache_file)
+    except OSError:
+        pass  # The cache is only an optimization, failing to write it is OK
+
+
 def _get_import_statements(code: str) -> list[str]:
     """Get all import statements from a given code string.
 
+    The result is cached by content hash (in-memory and across runs), so
+    callers must not mutate the returned list.
+
+    Args:
+        code: The code to extract import statements from.
+
+    Returns:
+        A list of import statements.
+    """
+    # pylint: disable-next=global-statement
+    global _imports_cache, _imports_cache_dirty
+
+    if _imports_cache is None:
+        _imports_cache = _load_imports_cache()
+        atexit.register(_save_imports_cache)
+
+    digest = hashlib.blake2b(code.encode("utf8"), digest_size=16).hexdigest()
+    import_statements = _imports_cache.get(digest)
+    if import_statements is None:
+        import_statements = _parse_import_statements(code)
+        _imports_cache[digest] = import_statements
+        _imports_cache_dirty = True
+    return import_statements
+
+
+def _parse_import_statements(code: str) -> list[str]:
+    """Parse all import statements from a given code string.
+
     Args:
         code: The code to extract import statements from.
 
@@ -72,20 +164,60 @@ def _get_import_statements(code: str) -> list[str]:
         A list of import statements.
     """
     tree = ast.parse(code)
+    # Split the source only once instead of using ast.get_source_segment(),
+    # which re-splits it for every import statement
+    lines = code.splitlines(keepends=True)
     import_statements: list[str] = []
 
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.Import, ast.ImportFrom)):
-            import_statement = ast.get_source_segment(code, node)
-            assert import_statement is not None
-            import_statements.append(import_statement)
-
+    def _scan(body: list[ast.stmt]) -> None:
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                import_statements.append(_source_segment(lines, node))
+            # Imports are essentially all top-level, but they can also appear
+            # nested in conditional blocks (e.g. `if TYPE_CHECKING:`) or
+            # guarded by try/except, so we only descend into those instead of
+            # walking every node in the tree
+            elif isinstance(node, ast.If):
+                _scan(node.body)
+                _scan(node.orelse)
+            elif isinstance(node, ast.Try):
+                _scan(node.body)
+                for handler in node.handlers:
+                    _scan(handler.body)
+                _scan(node.orelse)
+                _scan(node.finalbody)
+
+    _scan(tree.body)
     return import_statements
 
 
-def _path_to_import_statement(path: Path) -> str:
+def _source_segment(lines: list[str], node: ast.stmt) -> str:
+    """Get the source segment for a node from the already split source lines.
+
+    Args:
+        lines: The source lines, as returned by `splitlines(keepends=True)`.
+        node: The node to get the source segment for.
+
+    Returns:
+        The source segment for the node.
+    """
+    assert node.end_lineno is not None
+    assert node.end_col_offset is not None
+    if node.lineno == node.end_lineno:
+        return lines[node.lineno - 1][node.col_offset : node.end_col_offset]
+    first = lines[node.lineno - 1][node.col_offset :]
+    middle = "".join(lines[node.lineno : node.end_lineno - 1])
+    last = lines[node.end_lineno - 1][: node.end_col_offset]
+    return first + middle + last
+
+
+@functools.cache
+def _path_to_import_statement(path: str) -> str:
     """Convert a path to a Python file to an import statement.
 
+    The result is cached, as there is a fixed set of source files per run but
+    the conversion is requested once per code example.
+
     Args:
         path: The path to convert.
 
@@ -95,21 +227,23 @@ def _path_to_import_statement(path: Path) -> str:
     Raises:
         ValueError: If the path does not point to a Python file.
     """
-    # Make the path relative to the present working directory
-    if path.is_absolute():
-        path = path.relative_to(Path.cwd())
-
     # Check if the path is a Python file
-    if path.suffix != ".py":
+    if not path.endswith(".py"):
         raise ValueError("Path must point to a Python file (.py)")
 
-    # Remove 'src' prefix if present
-    parts = path.parts
+    # Make the path relative to the present working directory (only checking
+    # for absoluteness first, as relpath() needs to look up the much more
+    # expensive current working directory)
+    if os.path.isabs(path):
+        path = os.path.relpath(path)
+
+    # Remove the '.py' extension and split into parts, dropping the 'src'
+    # prefix if present
+    parts = path[: -len(".py")].split(os.sep)
     if parts[0] == "src":
         parts = parts[1:]
 
-    # Remove the '.py' extension and join parts with '.'
-    module_path = ".".join(parts)[:-3]
+    module_path = ".".join(parts)
 
     # Create the import statement
     import_statement = f"from {module_path} import *"
@@ -132,11 +266,17 @@ class _CustomPythonCodeBlockParser(CodeBlockParser):
     line numbers are correct.
 
     Pylint warnings which are unimportant for code examples are disabled.
+
+    To avoid paying the pylint start-up cost once per example, all examples in
+    a document are validated together in a single pylint run the first time any
+    of them is evaluated, and the results are cached for the subsequent
+    evaluations.
     """
 
     def __init__(self) -> None:
         """Initialize the parser."""
         super().__init__("python")
+        self._results_by_document: dict[int, dict[tuple[int, int], str | None]] = {}
 
     def evaluate(self, example: Example) -> None | str:
         """Validate the extracted code example using pylint.
@@ -147,90 +287,246 @@ class _CustomPythonCodeBlockParser(CodeBlockParser):
         Returns:
             None if the code example is valid, otherwise the pylint output.
         """
-        # Get the import statements for the original file
-        import_header = _get_import_statements(example.document.text)
-        # Add a wildcard import of the original file
-        import_header.append(
-            _path_to_import_statement(Path(os.path.relpath(example.path)))
-        )
-        imports_code = "\n".join(import_header)
+        document_results = self._results_by_document.get(id(example.document))
+        if document_results is None:
+            document_results = self._evaluate_document(example.document)
+            self._results_by_document[id(example.document)] = document_results
+        # Examples skipped as trivial have no entry, which means they are valid
+        return document_results.get((example.start, example.end))
+
+    def _evaluate_document(
+        self, document: Document
+    ) -> dict[tuple[int, int], str | None]:
+        """Validate all code examples in a document using a single pylint run.
 
-        # Dedent the code example
-        # There is also example.parsed that is already prepared, but it has
-        # empty lines stripped and thus fucks up the line numbers.
-        example_code = textwrap.dedent(
-            example.document.text[example.start : example.end]
-        )
-        # Remove first line (the line with the triple backticks)
-        example_code = example_code[example_code.find("\n") + 1 :]
-
-        example_with_imports = _FORMAT_STRING.format(
-            disable_pylint=_PYLINT_DISABLE_COMMENT.format("disable"),
-            imports=imports_code,
-            enable_pylint=_PYLINT_DISABLE_COMMENT.format("enable"),
-            code=example_code,
-        )
+        Args:
+            document: The document to validate the code examples of.
 
-        # Make sure the line numbers are correct
-        source = pad(
-            example_with_imports,
-            example.line - imports_code.count("\n") - _FORMAT_STRING.count("\n"),
+        Returns:
+            A mapping from each example's (start, end) position in the document
+                to the validation error message, or `None` if the example is
+                valid.
+        """
+        examples: list[Example] = []
+        rendered: list[tuple[str, str]] = []
+        for example in document:
+            # This deliberately compares against the bound method, as it is
+            # what is registered as the evaluator for this parser's regions
+            # pylint: disable-next=comparison-with-callable
+            if example.region.evaluator != self.evaluate:
+                continue
+            example_code = _get_example_code(example)
+            # Trivially empty or import-only examples can't produce any
+            # relevant diagnostics, so don't pay a pylint run for them
+            if _is_trivial_example(example_code):
+                continue
+            examples.append(example)
+            rendered.append(_build_example_source(example, example_code))
+
+        responses = _validate_with_pylint(
+            [source for _, source in rendered], document.path, _PYLINT_DISABLE_PARAMS
         )
 
-        # pylint disable parameters
-        pylint_disable_params = [
-            "missing-module-docstring",
-            "missing-class-docstring",
-            "missing-function-docstring",
-            "reimported",
-            "unused-variable",
-            "no-name-in-module",
-            "await-outside-async",
-        ]
-
-        response = _validate_with_pylint(source, example.path, pylint_disable_params)
-
-        if len(response) > 0:
-            return (
-                f"Pylint validation failed for code example:\n"
-                f"{example_with_imports}\nOutput: " + "\n".join(response)
-            )
+        results: dict[tuple[int, int], str | None] = {}
+        for example, (example_with_imports, _), response in zip(
+            examples, rendered, responses
+        ):
+            result = None
+            if len(response) > 0:
+                result = (
+                    f"Pylint validation failed for code example:\n"
+                    f"{example_with_imports}\nOutput: " + "\n".join(response)
+                )
+            results[(example.start, example.end)] = result
+        return results
 
-        return None
+
+def _get_example_code(example: Example) -> str:
+    """Get the plain code of a code example.
+
+    Args:
+        example: The extracted code example.
+
+    Returns:
+        The dedented code example, without the fence line.
+    """
+    # Dedent the code example
+    # There is also example.parsed that is already prepared, but it has
+    # empty lines stripped and thus fucks up the line numbers.
+    example_code = example.document.text[example.start : example.end]
+    # The first line is the one with the triple backticks, so if it doesn't
+    # start with whitespace there is no common indentation to remove and the
+    # per-line regex scan done by textwrap.dedent() can be skipped entirely
+    if example_code[:1] in (" ", "\t"):
+        example_code = textwrap.dedent(example_code)
+    # Remove first line (the line with the triple backticks)
+    return example_code[example_code.find("\n") + 1 :]
+
+
+def _is_trivial_example(example_code: str) -> bool:
+    """Check whether a code example is too trivial to be worth validating.
+
+    Examples that are empty or contain only import statements and constant
+    expressions (like `...` or a bare string) can't produce any relevant
+    pylint diagnostics, so validating them only wastes a pylint run.
+
+    Args:
+        example_code: The plain code of the example.
+
+    Returns:
+        Whether validating the example can be skipped.
+    """
+    if not example_code.strip():
+        return True
+    try:
+        tree = ast.parse(example_code)
+    except SyntaxError:
+        return False  # Let pylint report the syntax error
+    return all(
+        isinstance(node, (ast.Import, ast.ImportFrom))
+        or (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant))
+        for node in tree.body
+    )
+
+
+def _build_example_source(example: Example, example_code: str) -> tuple[str, str]:
+    """Build the source to validate for a code example.
+
+    Args:
+        example: The extracted code example.
+        example_code: The plain code of the example.
+
+    Returns:
+        A tuple with the code example including the generated import header and
+            the same code padded with empty lines so line numbers match the
+            original document.
+    """
+    # Get the generated import header for the original file
+    imports_code, imports_newlines = _get_import_header(
+        example.document.text, example.path
+    )
+
+    example_with_imports = (
+        _IMPORTS_PREFIX + imports_code + _IMPORTS_SUFFIX + example_code
+    )
+
+    # Make sure the line numbers are correct
+    source = pad(
+        example_with_imports,
+        example.line - imports_newlines - _SCAFFOLDING_NEWLINES,
+    )
+    return example_with_imports, source
+
+
+@functools.cache
+def _get_import_header(text: str, path: str) -> tuple[str, int]:
+    """Get the generated import header for a document.
+
+    All examples of a document share the same import header, so it is only
+    assembled (and its newlines counted, needed to adjust the padding of each
+    example) once per document.
+
+    Args:
+        text: The document text.
+        path: The path to the document.
+
+    Returns:
+        A tuple with the import header code and the number of newlines in it.
+    """
+    import_header = [*_get_import_statements(text), _path_to_import_statement(path)]
+    imports_code = "\n".join(import_header)
+    return imports_code, imports_code.count("\n")
 
 
 def _validate_with_pylint(
-    code_example: str, path: str, disable_params: list[str]
-) -> list[str]:
-    """Validate a code example using pylint.
+    code_examples: list[str], path: str, disable_params: list[str]
+) -> list[list[str]]:
+    """Validate code examples using a single pylint run.
 
     Args:
-        code_example: The code example to validate.
+        code_examples: The code examples to validate.
         path: The path to the original file.
         disable_params: The pylint disable parameters.
 
     Returns:
-        A list of pylint messages.
+        A list with the pylint messages for each code example, in the same
+            order as `code_examples`.
     """
-    try:
-        pylint_command = [
-            "pylint",
-            "--disable",
-            ",".join(disable_params),
-            "--from-stdin",
-            path,
-        ]
-
-        subprocess.run(
-            pylint_command,
-            input=code_example,
-            text=True,
-            capture_output=True,
-            check=True,
+    responses: list[list[str]] = [[] for _ in code_examples]
+    if not code_examples:
+        return responses
+
+    disable = ",".join(disable_params)
+    with tempfile.TemporaryDirectory(prefix="sybil-pylint-") as tmp_dir:
+        example_paths: list[str] = []
+        for number, code_example in enumerate(code_examples):
+            example_file = Path(tmp_dir) / f"example_{number}.py"
+            example_file.write_text(code_example, encoding="utf8")
+            example_paths.append(str(example_file))
+
+        # Examples are independent of each other, so they can be validated in
+        # parallel, one pylint run per example. For a single example the pool
+        # overhead is not worth it, so it is validated directly in-process.
+        if len(example_paths) == 1:
+            outputs = [_run_pylint(example_paths[0], disable)]
+        else:
+            outputs = list(
+                _get_executor().map(
+                    _run_pylint, example_paths, itertools.repeat(disable)
+                )
+            )
+
+    # Messages for each example start with the path of the temporary file it
+    # was saved to, so they can be mapped back to the example they belong to
+    # (reporting the original file's path instead).
+    for number, (example_path, output) in enumerate(zip(example_paths, outputs)):
+        for line in output.splitlines():
+            if line.startswith(example_path):
+                responses[number].append(path + line[len(example_path) :])
+
+    return responses
+
+
+_executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Get the process pool used to validate code examples.
+
+    The pool is created on first use and kept alive for the rest of the
+    session, so the workers (which inherit the already imported pylint) are
+    reused across documents instead of being re-spawned for every batch.
+
+    Returns:
+        The process pool.
+    """
+    # pylint: disable-next=global-statement
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1
         )
-    except subprocess.CalledProcessError as exception:
-        output = exception.output
-        assert isinstance(output, str)
-        return output.splitlines()
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def _run_pylint(path: str, disable: str) -> str:
+    """Run pylint on the given file.
 
-    return []
+    Running pylint in-process avoids forking a new Python interpreter and
+    re-importing pylint and astroid for every run.
+
+    Args:
+        path: The path to the file to validate.
+        disable: The pylint checks to disable, as a comma-separated string.
+
+    Returns:
+        The pylint text output.
+    """
+    output = io.StringIO()
+    Run(
+        ["--disable", disable, path],
+        reporter=TextReporter(output),
+        exit=False,
+    )
+    return output.getvalue()